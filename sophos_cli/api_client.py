@@ -1,19 +1,113 @@
 """Sophos API Client for Partner and Endpoint APIs"""
 
+import asyncio
+import json
+import numpy as np
 import os
 import requests
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+# Optional HTTP/2 support: when httpx is installed, the endpoint fan-out
+# multiplexes requests over one connection per regional API host
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# orjson decodes the large paginated payloads several times faster than
+# the stdlib; fall back to the response's own parser when it's missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Advertise brotli only when urllib3 can actually decode it (JSON listings
+# compress well either way, but br shaves a bit more off the wire)
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
 # Load environment variables
 load_dotenv()
 
+# Placeholder for missing values, hoisted out of the per-endpoint hot loop
+_NA = "N/A"
+
+
+@dataclass(slots=True)
+class EndpointRow:
+    """One endpoint in the get_all_endpoints output"""
+
+    tenant_id: str
+    tenant_name: str
+    endpoint_hostname: str
+    endpoint_os: str
+    endpoint_os_version: str
+    last_active: str
+
+    def to_dict(self) -> Dict:
+        """Return the row as a plain dict (e.g. for CSV export)"""
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class HealthRow:
+    """One tenant's summarized scores in the get_all_tenant_health output"""
+
+    tenant_name: str
+    tenant_id: str
+    overall_score: "float | str"
+    protection_score: "float | str"
+    policy_score: "float | str"
+    exclusions_score: "float | str"
+    tamper_protection_score: "float | str"
+    firewall_score: "float | str"
+
+    def to_dict(self) -> Dict:
+        """Return the row as a plain dict (e.g. for CSV export)"""
+        return asdict(self)
+
 
 class SophosAPIClient:
     """Client for interacting with Sophos Partner and Endpoint APIs"""
 
     AUTH_URL = "https://id.sophos.com/api/v2/oauth2/token"
     PARTNER_API_BASE = "https://api.central.sophos.com"
+    CACHE_DIR = Path.home() / ".cache" / "sophos-cli"
+
+    # Large pages amortize per-request overhead across more items; if the
+    # server rejects the size with a 400 we drop back to 100 once and
+    # remember the effective size for the rest of the session
+    TENANTS_PAGE_SIZE = 500
+    ENDPOINTS_PAGE_SIZE = 500
+    FALLBACK_PAGE_SIZE = 100
+
+    # In-memory TTL per cached call, in seconds. Tenants and whoami are
+    # effectively static within a session; health changes often, so its
+    # window is kept short
+    TENANTS_TTL = 300
+    WHOAMI_TTL = 300
+    HEALTH_TTL = 10
+
+    # The tenants list barely changes, so it is also persisted across
+    # runs; within this window a fresh CLI launch serves it from disk
+    TENANTS_DISK_TTL = 3600
+
+    # Default ceiling on concurrent per-tenant requests. High enough to
+    # collapse the fan-out latency, low enough to stay clear of the
+    # Sophos API's rate limits; override with SOPHOS_CLI_MAX_CONCURRENCY
+    DEFAULT_MAX_CONCURRENCY = 16
 
     def __init__(self):
         """Initialize the API client with credentials from environment"""
@@ -28,14 +122,265 @@ class SophosAPIClient:
 
         self.access_token: Optional[str] = None
         self.partner_id: Optional[str] = None
+        self._token_expiry = 0.0
+        self._tenants_page_size = self.TENANTS_PAGE_SIZE
+        self._endpoints_page_size = self.ENDPOINTS_PAGE_SIZE
+
+        try:
+            self._max_concurrency = max(1, int(os.getenv(
+                "SOPHOS_CLI_MAX_CONCURRENCY", self.DEFAULT_MAX_CONCURRENCY)))
+        except ValueError:
+            self._max_concurrency = self.DEFAULT_MAX_CONCURRENCY
+
+        # One session for every call: connections to id.sophos.com,
+        # api.central.sophos.com and the regional API hosts are pooled and
+        # reused instead of paying a TLS handshake per request
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                # Honor the server's Retry-After on 429s rather than
+                # hammering it on our own schedule
+                respect_retry_after_header=True
+            )
+        )
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING
+        })
+
+        # ETag cache for conditional GETs: maps a URL+params key to the
+        # last ETag and parsed body, so unchanged responses come back as
+        # an empty 304 instead of a full payload. Only keys touched this
+        # session are persisted again, so superseded entries (e.g. old
+        # pageFromKey cursors) don't accumulate across runs
+        self._etag_cache: Dict[str, list] = self._load_etag_cache()
+        self._etag_touched: set = set()
+
+        # Short-lived in-memory cache so repeated menu selections within
+        # one session don't re-hit the API: key -> [expires_at, value]
+        self._ttl_cache: Dict[tuple, list] = {}
+
+        # Serializes tenant fetches so a menu call made while the
+        # background prefetch is in flight waits for it and then hits
+        # the cache instead of fetching the same pages twice
+        self._tenants_fetch_lock = threading.Lock()
+
+        # Reuse a still-valid token (and the whoami answer issued with
+        # it) from a previous run so each CLI invocation doesn't start
+        # with a fresh auth round-trip
+        self._whoami_cache: Optional[Dict] = None
+        self._load_token_cache()
+
+    def _load_token_cache(self):
+        """Load a previously issued access token if it hasn't expired"""
+        try:
+            with open(self.CACHE_DIR / "token.json", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if cached.get("access_token") and time.time() < cached.get("expires_at", 0):
+            self.access_token = cached["access_token"]
+            self._token_expiry = cached["expires_at"]
+            self.partner_id = cached.get("partner_id")
+            self._whoami_cache = cached.get("whoami")
+            self._session.headers["Authorization"] = f"Bearer {self.access_token}"
+
+    def _save_token_cache(self):
+        """Persist the current access token for subsequent CLI runs"""
+        try:
+            self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            token_path = self.CACHE_DIR / "token.json"
+            token_path.touch(mode=0o600)
+            with open(token_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "access_token": self.access_token,
+                    "expires_at": self._token_expiry,
+                    "partner_id": self.partner_id,
+                    "whoami": self._whoami_cache
+                }, f)
+        except OSError:
+            pass  # Caching is best-effort; never fail the command for it
+
+    @staticmethod
+    def _json(response) -> Dict:
+        """Parse a response body, preferring orjson when available"""
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    def _ttl_get(self, key: tuple):
+        """Return a cached value if its TTL hasn't elapsed, else None"""
+        entry = self._ttl_cache.get(key)
+        if entry is not None and time.time() < entry[0]:
+            return entry[1]
+        return None
+
+    def _ttl_set(self, key: tuple, value, ttl: float):
+        """Cache a value under key for ttl seconds"""
+        self._ttl_cache[key] = [time.time() + ttl, value]
+
+    def clear_cache(self):
+        """Drop all cached responses so the next calls re-fetch"""
+        self._ttl_cache.clear()
+        # Also remove the on-disk tenants copy: within its TTL it would
+        # serve the very next get_tenants, defeating the refresh
+        try:
+            (self.CACHE_DIR / "tenants.json").unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def _ensure_token(self):
+        """Authenticate if there is no token or the current one has expired"""
+        if not self.access_token or time.time() >= self._token_expiry:
+            self.authenticate()
+
+    def _load_etag_cache(self) -> Dict[str, list]:
+        """Load the persisted ETag cache, or start empty"""
+        try:
+            with open(self.CACHE_DIR / "http_cache.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_etag_cache(self):
+        """
+        Persist the ETag entries used this session for subsequent runs
+
+        Dropping untouched entries bounds the cache at one session's
+        working set: dead keys — superseded page cursors, renamed
+        hosts — would otherwise grow the file (and every startup's
+        parse of it) forever.
+        """
+        live = {key: value for key, value in self._etag_cache.items()
+                if key in self._etag_touched}
+        try:
+            self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self.CACHE_DIR / "http_cache.json", "w", encoding="utf-8") as f:
+                json.dump(live, f)
+        except OSError:
+            pass  # Caching is best-effort; never fail the command for it
+
+    def _load_tenants_disk_cache(self, max_age: Optional[float] = None) -> Optional[List[Dict]]:
+        """
+        Load the persisted tenants list
+
+        Args:
+            max_age: Maximum cache age in seconds; omit to accept stale
+                data (used as a fallback when the API is unreachable)
+
+        Returns:
+            list: Cached tenant dictionaries, or None if absent/expired
+        """
+        path = self.CACHE_DIR / "tenants.json"
+        try:
+            if max_age is not None and time.time() - path.stat().st_mtime > max_age:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_tenants_disk_cache(self, tenants: List[Dict]):
+        """Persist the tenants list atomically for subsequent CLI runs"""
+        try:
+            self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.CACHE_DIR / "tenants.json.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(tenants, f)
+            os.replace(tmp_path, self.CACHE_DIR / "tenants.json")
+        except OSError:
+            pass  # Caching is best-effort; never fail the command for it
+
+    def _conditional_get(self, url: str, headers: Optional[Dict] = None,
+                         params: Optional[Dict] = None) -> Dict:
+        """
+        Issue a GET with If-None-Match revalidation
+
+        Args:
+            url: The URL to request
+            headers: Extra request headers
+            params: Query string parameters
+
+        Returns:
+            dict: The parsed JSON body (from cache on a 304)
+        """
+        key = url if not params else f"{url}?{urlencode(sorted(params.items()))}"
+
+        # The scoping headers are part of the resource identity: every
+        # tenant on a regional host hits the same URL and differs only
+        # by X-Tenant-ID, so they must not share a cache slot
+        if headers:
+            for scope_header in ("X-Tenant-ID", "X-Partner-ID"):
+                scope = headers.get(scope_header)
+                if scope:
+                    key = f"{key}#{scope_header}={scope}"
+
+        self._etag_touched.add(key)
+        cached = self._etag_cache.get(key)
+
+        headers = dict(headers) if headers else {}
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        # The with blocks hand sockets back to the pool and free the
+        # body buffers as soon as each response is consumed
+        with self._session.get(url, headers=headers, params=params) as response:
+            # A cached token can be revoked server-side before its expiry;
+            # re-authenticate once and retry rather than failing the command
+            if response.status_code == 401:
+                self.access_token = None
+                self._token_expiry = 0.0
+                self.authenticate()
+                with self._session.get(url, headers=headers, params=params) as retried:
+                    return self._finish_get(key, cached, retried)
+
+            return self._finish_get(key, cached, response)
+
+    def _finish_get(self, key: str, cached: Optional[list], response) -> Dict:
+        """Turn a conditional-GET response into a parsed body"""
+        if response.status_code == 304 and cached:
+            return cached[1]
+
+        response.raise_for_status()
+        data = self._json(response)
+
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etag_cache[key] = [etag, data]
+
+        return data
+
+    def close(self):
+        """Close the underlying HTTP session and its pooled connections"""
+        self._save_etag_cache()
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def authenticate(self) -> str:
         """
         Authenticate with Sophos and get an access token
 
+        A token from a previous call (or a previous CLI run, via the
+        on-disk cache) is reused until shortly before its expiry.
+
         Returns:
             str: The access token
         """
+        if self.access_token and time.time() < self._token_expiry:
+            return self.access_token
+
         data = {
             "grant_type": "client_credentials",
             "client_id": self.client_id,
@@ -47,12 +392,19 @@ class SophosAPIClient:
             "Content-Type": "application/x-www-form-urlencoded"
         }
 
-        response = requests.post(self.AUTH_URL, data=data, headers=headers)
-        response.raise_for_status()
-
-        token_data = response.json()
+        with self._session.post(self.AUTH_URL, data=data, headers=headers) as response:
+            response.raise_for_status()
+            token_data = self._json(response)
         self.access_token = token_data["access_token"]
 
+        # Renew a minute early so in-flight calls never race the expiry
+        self._token_expiry = time.time() + token_data.get("expires_in", 3600) - 60
+        self._save_token_cache()
+
+        # Attach the token to the session so every subsequent call
+        # inherits it without rebuilding a headers dict
+        self._session.headers["Authorization"] = f"Bearer {self.access_token}"
+
         return self.access_token
 
     def get_whoami(self) -> Dict:
@@ -62,74 +414,137 @@ class SophosAPIClient:
         Returns:
             dict: Information including partner ID and API host
         """
-        if not self.access_token:
-            self.authenticate()
+        cached = self._ttl_get(("whoami",))
+        if cached is not None:
+            return cached
 
-        headers = {
-            "Authorization": f"Bearer {self.access_token}"
-        }
+        # The whoami answer is tied to the credentials, so a copy saved
+        # alongside a still-valid token from a previous run is current
+        if self._whoami_cache is not None and self.access_token and time.time() < self._token_expiry:
+            return self._whoami_cache
 
-        response = requests.get(
-            f"{self.PARTNER_API_BASE}/whoami/v1",
-            headers=headers
-        )
-        response.raise_for_status()
+        self._ensure_token()
 
-        whoami_data = response.json()
+        whoami_data = self._conditional_get(f"{self.PARTNER_API_BASE}/whoami/v1")
 
-        # Store partner ID if this is a partner account
+        # Store partner ID if this is a partner account; it is stable
+        # for the lifetime of the credentials. The full response is
+        # persisted next to the token so the next run can skip the call
         if whoami_data.get("idType") == "partner":
             self.partner_id = whoami_data.get("id")
+        self._whoami_cache = whoami_data
+        self._save_token_cache()
 
+        self._ttl_set(("whoami",), whoami_data, self.WHOAMI_TTL)
         return whoami_data
 
+    def _fetch_tenant_page(self, page: int) -> List[Dict]:
+        """
+        Fetch a single page of the tenants listing
+
+        Args:
+            page: The 1-based page number to request
+
+        Returns:
+            list: Tenant dictionaries on that page
+        """
+        data = self._conditional_get(
+            f"{self.PARTNER_API_BASE}/partner/v1/tenants",
+            headers={"X-Partner-ID": self.partner_id},
+            params={"page": page, "pageSize": self._tenants_page_size}
+        )
+
+        return data.get("items", [])
+
     def get_tenants(self) -> List[Dict]:
         """
         Get all tenants under the partner account
 
+        Page 1 is fetched first to learn the total page count; any
+        remaining pages are then fetched concurrently instead of walking
+        them one round-trip at a time.
+
         Returns:
             list: List of tenant dictionaries
         """
-        if not self.access_token:
-            self.authenticate()
+        cached = self._ttl_get(("tenants",))
+        if cached is not None:
+            return cached
 
-        if not self.partner_id:
-            whoami = self.get_whoami()
-            if whoami.get("idType") != "partner":
-                raise ValueError("This API client requires a partner account")
+        with self._tenants_fetch_lock:
+            # A prefetch may have populated the cache while we waited
+            cached = self._ttl_get(("tenants",))
+            if cached is not None:
+                return cached
 
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "X-Partner-ID": self.partner_id
-        }
+            disk_cached = self._load_tenants_disk_cache(self.TENANTS_DISK_TTL)
+            if disk_cached is not None:
+                self._ttl_set(("tenants",), disk_cached, self.TENANTS_TTL)
+                return disk_cached
 
-        all_tenants = []
-        page = 1
-
-        while True:
-            params = {"page": page, "pageSize": 100}
+            try:
+                all_tenants = self._fetch_all_tenants()
+            except requests.RequestException as e:
+                # Stale-while-unreachable: a dated tenants list beats a dead CLI
+                stale = self._load_tenants_disk_cache()
+                if stale is None:
+                    raise
+                print(f"Warning: Sophos API unreachable ({e}); using cached tenants list")
+                return stale
+
+            self._save_tenants_disk_cache(all_tenants)
+            self._ttl_set(("tenants",), all_tenants, self.TENANTS_TTL)
+            return all_tenants
+
+    def prefetch_tenants(self):
+        """
+        Warm the tenants cache on a background thread
 
-            response = requests.get(
-                f"{self.PARTNER_API_BASE}/partner/v1/tenants",
-                headers=headers,
-                params=params
-            )
-            response.raise_for_status()
+        Called right after authentication so that by the time the user
+        picks a menu item the tenants list is usually already cached.
+        Errors are swallowed here; a foreground call will surface them.
+        """
+        def worker():
+            try:
+                self.get_tenants()
+            except Exception:
+                pass
 
-            data = response.json()
-            tenants = data.get("items", [])
+        threading.Thread(target=worker, daemon=True).start()
 
-            if not tenants:
-                break
+    def _fetch_all_tenants(self) -> List[Dict]:
+        """Fetch every tenants page from the API, sorted by name"""
+        self._ensure_token()
 
-            all_tenants.extend(tenants)
+        if not self.partner_id:
+            whoami = self.get_whoami()
+            if whoami.get("idType") != "partner":
+                raise ValueError("This API client requires a partner account")
 
-            # Check if there are more pages
-            pages = data.get("pages", {})
-            if page >= pages.get("total", 1):
-                break
+        try:
+            data = self._conditional_get(
+                f"{self.PARTNER_API_BASE}/partner/v1/tenants",
+                headers={"X-Partner-ID": self.partner_id},
+                params={"page": 1, "pageSize": self._tenants_page_size}
+            )
+        except requests.HTTPError as e:
+            # Server rejected the page size; retry once at the safe size
+            if (e.response is None or e.response.status_code != 400
+                    or self._tenants_page_size == self.FALLBACK_PAGE_SIZE):
+                raise
+            self._tenants_page_size = self.FALLBACK_PAGE_SIZE
+            data = self._conditional_get(
+                f"{self.PARTNER_API_BASE}/partner/v1/tenants",
+                headers={"X-Partner-ID": self.partner_id},
+                params={"page": 1, "pageSize": self._tenants_page_size}
+            )
+        all_tenants = data.get("items", [])
+        total_pages = data.get("pages", {}).get("total", 1)
 
-            page += 1
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for items in executor.map(self._fetch_tenant_page, range(2, total_pages + 1)):
+                    all_tenants.extend(items)
 
         # Sort tenants by name
         all_tenants.sort(key=lambda x: x.get("name", "").lower())
@@ -147,98 +562,352 @@ class SophosAPIClient:
         Returns:
             list: List of endpoint dictionaries
         """
-        if not self.access_token:
-            self.authenticate()
+        self._ensure_token()
 
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "X-Tenant-ID": tenant_id
-        }
+        headers = {"X-Tenant-ID": tenant_id}
 
         all_endpoints = []
         page_from_key = None
 
+        # Bind loop invariants to locals; the cursor walk runs once per
+        # page and these lookups add up across tenants
+        url = f"{api_host}/endpoint/v1/endpoints"
+        conditional_get = self._conditional_get
+        extend = all_endpoints.extend
+
         while True:
-            params = {"pageSize": 100}
+            params = {"pageSize": self._endpoints_page_size}
             if page_from_key:
                 params["pageFromKey"] = page_from_key
 
-            response = requests.get(
-                f"{api_host}/endpoint/v1/endpoints",
-                headers=headers,
-                params=params
-            )
-            response.raise_for_status()
-
-            data = response.json()
+            try:
+                data = conditional_get(url, headers=headers, params=params)
+            except requests.HTTPError as e:
+                # Server rejected the page size; retry once at the safe size
+                if (page_from_key or e.response is None
+                        or e.response.status_code != 400
+                        or self._endpoints_page_size == self.FALLBACK_PAGE_SIZE):
+                    raise
+                self._endpoints_page_size = self.FALLBACK_PAGE_SIZE
+                params["pageSize"] = self._endpoints_page_size
+                data = conditional_get(url, headers=headers, params=params)
             endpoints = data.get("items", [])
 
             if not endpoints:
                 break
 
-            all_endpoints.extend(endpoints)
+            extend(endpoints)
 
             # Check for next page
-            pages = data.get("pages", {})
-            page_from_key = pages.get("nextKey")
+            page_from_key = data.get("pages", {}).get("nextKey")
 
             if not page_from_key:
                 break
 
         return all_endpoints
 
-    def get_all_endpoints(self) -> List[Dict]:
+    @staticmethod
+    def _flatten_endpoints(tenant_id: str, tenant_name: str, endpoints: List[Dict]) -> List[EndpointRow]:
         """
-        Get all endpoints across all tenants
+        Flatten raw endpoint records into the output row format
+
+        Args:
+            tenant_id: The tenant ID
+            tenant_name: The tenant display name
+            endpoints: Raw endpoint dictionaries from the API
 
         Returns:
-            list: List of dictionaries containing tenant info and endpoints
+            list: List of EndpointRow records
         """
-        tenants = self.get_tenants()
-        all_data = []
+        rows = []
+
+        for endpoint in endpoints:
+            os_info = endpoint.get("os", {})
+            build = os_info.get("build", _NA)
+            last_seen = endpoint.get("lastSeenAt", _NA)
+
+            # lastSeenAt is ISO-8601 (YYYY-MM-DDTHH:MM:SS...), so the date
+            # is a fixed-width prefix; anything else is left untouched
+            if last_seen != _NA and len(last_seen) >= 10 and last_seen[10:11] in ("T", ""):
+                last_seen = last_seen[:10]
+
+            rows.append(EndpointRow(
+                tenant_id=tenant_id,
+                tenant_name=tenant_name,
+                endpoint_hostname=endpoint.get("hostname", _NA),
+                endpoint_os=os_info.get("name", _NA),
+                endpoint_os_version=build,
+                last_active=last_seen
+            ))
+
+        # Sort within the tenant now; get_tenants already returns tenants
+        # name-sorted and the fan-outs preserve that order, so the global
+        # result is ordered without a second full-list sort
+        rows.sort(key=lambda x: x.endpoint_hostname.lower())
+
+        return rows
+
+    def _collect_endpoints_for_tenant(self, tenant: Dict) -> List[EndpointRow]:
+        """
+        Fetch and flatten the endpoint rows for a single tenant
+
+        Errors are caught here so one failing tenant doesn't abort the
+        whole fan-out.
+
+        Args:
+            tenant: A tenant dictionary as returned by get_tenants
+
+        Returns:
+            list: List of EndpointRow records (empty on failure)
+        """
+        tenant_id = tenant.get("id")
+        tenant_name = tenant.get("name")
+        api_host = tenant.get("apiHost")
+
+        if not tenant_id or not api_host:
+            return []
+
+        try:
+            endpoints = self.get_endpoints_for_tenant(tenant_id, api_host)
+        except Exception as e:
+            # Continue with other tenants if one fails
+            print(f"Warning: Failed to get endpoints for tenant {tenant_name}: {e}")
+            return []
 
-        for tenant in tenants:
-            tenant_id = tenant.get("id")
-            tenant_name = tenant.get("name")
-            api_host = tenant.get("apiHost")
+        return self._flatten_endpoints(tenant_id, tenant_name, endpoints)
+
+    # Retryable statuses for the async path, mirroring the session
+    # adapter's Retry configuration
+    _RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+    def _async_client(self) -> "httpx.AsyncClient":
+        """
+        Build the shared async client for a fan-out
 
-            if not tenant_id or not api_host:
+        Ensures a valid token before baking the Authorization header
+        in, and sets an explicit timeout: httpx defaults to 5 seconds,
+        which large endpoint pages can exceed.
+        """
+        self._ensure_token()
+        return httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            headers={
+                "Accept": "application/json",
+                "Authorization": f"Bearer {self.access_token}"
+            },
+            timeout=30.0
+        )
+
+    async def _aget(self, client: "httpx.AsyncClient", url: str,
+                    headers: Optional[Dict] = None, params: Optional[Dict] = None):
+        """
+        GET on the shared async client with the sync path's resilience
+
+        Mirrors the session adapter: up to three retries with backoff
+        on 429/5xx honoring Retry-After, plus the conditional-GET
+        behavior of re-authenticating once on 401 (a cached token can
+        be revoked server-side before its expiry).
+
+        Returns:
+            httpx.Response: The last response received
+        """
+        reauthed = False
+        for attempt in range(4):
+            response = await client.get(url, headers=headers, params=params)
+
+            if response.status_code == 401 and not reauthed:
+                reauthed = True
+                self.access_token = None
+                self._token_expiry = 0.0
+                self.authenticate()
+                client.headers["Authorization"] = f"Bearer {self.access_token}"
                 continue
 
-            try:
-                endpoints = self.get_endpoints_for_tenant(tenant_id, api_host)
-
-                for endpoint in endpoints:
-                    os_info = endpoint.get("os", {})
-                    build = os_info.get("build", "N/A")
-                    last_seen = endpoint.get("lastSeenAt", "N/A")
-
-                    # Format date only (remove time portion)
-                    if last_seen != "N/A":
-                        try:
-                            # Parse ISO format and extract date only
-                            last_seen = last_seen.split("T")[0]
-                        except:
-                            pass  # Keep original if parsing fails
-
-                    all_data.append({
-                        "tenant_id": tenant_id,
-                        "tenant_name": tenant_name,
-                        "endpoint_hostname": endpoint.get("hostname", "N/A"),
-                        "endpoint_os": os_info.get("name", "N/A"),
-                        "endpoint_os_version": build,
-                        "last_active": last_seen
-                    })
-            except Exception as e:
-                # Continue with other tenants if one fails
-                print(f"Warning: Failed to get endpoints for tenant {tenant_name}: {e}")
+            if response.status_code in self._RETRY_STATUSES and attempt < 3:
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else 0.5 * (2 ** attempt)
+                await asyncio.sleep(delay)
                 continue
 
-        # Sort by tenant name, then hostname
-        all_data.sort(key=lambda x: (x.get("tenant_name", "").lower(), x.get("endpoint_hostname", "").lower()))
+            return response
+
+        return response
+
+    async def _aget_endpoints_for_tenant(self, client: "httpx.AsyncClient", tenant: Dict) -> List[EndpointRow]:
+        """
+        Async variant of the per-tenant endpoint collection
+
+        Walks the pageFromKey cursor for one tenant on the shared
+        HTTP/2 client; the cursor chain is serial within a tenant but
+        multiplexes with other tenants on the same connection.
+
+        Args:
+            client: The shared httpx.AsyncClient
+            tenant: A tenant dictionary as returned by get_tenants
+
+        Returns:
+            list: List of EndpointRow records (empty on failure)
+        """
+        tenant_id = tenant.get("id")
+        tenant_name = tenant.get("name")
+        api_host = tenant.get("apiHost")
+
+        if not tenant_id or not api_host:
+            return []
+
+        endpoints = []
+        page_from_key = None
+
+        # Bind loop invariants to locals, as in the sync cursor walk
+        url = f"{api_host}/endpoint/v1/endpoints"
+        headers = {"X-Tenant-ID": tenant_id}
+        extend = endpoints.extend
+
+        try:
+            while True:
+                params = {"pageSize": self._endpoints_page_size}
+                if page_from_key:
+                    params["pageFromKey"] = page_from_key
+
+                response = await self._aget(client, url, headers=headers, params=params)
+                response.raise_for_status()
+
+                data = self._json(response)
+                items = data.get("items", [])
+
+                if not items:
+                    break
+
+                extend(items)
+
+                page_from_key = data.get("pages", {}).get("nextKey")
+                if not page_from_key:
+                    break
+        except Exception as e:
+            # Continue with other tenants if one fails
+            print(f"Warning: Failed to get endpoints for tenant {tenant_name}: {e}")
+            return []
+
+        return self._flatten_endpoints(tenant_id, tenant_name, endpoints)
+
+    async def _aget_all_endpoints(self, progress_callback: Optional[Callable[[int, int], None]] = None,
+                                  on_rows: Optional[Callable[[List[EndpointRow]], None]] = None) -> List[EndpointRow]:
+        """
+        Gather endpoint rows for all tenants over a shared HTTP/2 client
+
+        Args:
+            progress_callback: Optional callable invoked as (done, total)
+                after each tenant completes
+            on_rows: Optional callable handed each tenant's rows; batches
+                are released in tenant order, not completion order, so
+                streamed output matches the sync path and the final list
+
+        Returns:
+            list: List of EndpointRow records across all tenants
+        """
+        tenants = self.get_tenants()
+        total = len(tenants)
+        done = 0
+
+        # Completed tenants are held here until every earlier tenant has
+        # been emitted, keeping on_rows prefix-complete in tenant order
+        pending: Dict[int, List[EndpointRow]] = {}
+        next_emit = 0
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async with self._async_client() as client:
+
+            async def collect(index, tenant):
+                nonlocal done, next_emit
+                async with semaphore:
+                    rows = await self._aget_endpoints_for_tenant(client, tenant)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+                if on_rows:
+                    pending[index] = rows
+                    while next_emit in pending:
+                        on_rows(pending.pop(next_emit))
+                        next_emit += 1
+                return rows
+
+            results = await asyncio.gather(*(collect(i, tenant) for i, tenant in enumerate(tenants)))
+
+        all_data = []
+        for rows in results:
+            all_data.extend(rows)
+
+        return all_data
+
+    def get_all_endpoints(self, progress_callback: Optional[Callable[[int, int], None]] = None,
+                          on_rows: Optional[Callable[[List[EndpointRow]], None]] = None) -> List[EndpointRow]:
+        """
+        Get all endpoints across all tenants
+
+        Tenants are fetched concurrently; the work is dominated by network
+        round-trips, so concurrency turns the serial sum of latencies into
+        roughly the slowest tenant's latency per batch of workers. When
+        httpx is installed the fan-out runs on an HTTP/2 client that
+        multiplexes tenants sharing a regional API host; otherwise it
+        falls back to a thread pool over the pooled session.
+
+        Args:
+            progress_callback: Optional callable invoked as (done, total)
+                after each tenant completes
+            on_rows: Optional callable handed each tenant's rows as soon
+                as that tenant completes, letting consumers (e.g. a CSV
+                writer) overlap their work with the remaining fetches
+
+        Returns:
+            list: List of EndpointRow records across all tenants
+        """
+        if httpx is not None:
+            all_data = asyncio.run(self._aget_all_endpoints(progress_callback, on_rows))
+        else:
+            tenants = self.get_tenants()
+            self._warm_api_hosts(tenants)
+            all_data = []
+            done = 0
+
+            with ThreadPoolExecutor(max_workers=min(self._max_concurrency, max(1, len(tenants)))) as executor:
+                for rows in executor.map(self._collect_endpoints_for_tenant, tenants):
+                    all_data.extend(rows)
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, len(tenants))
+                    if on_rows:
+                        on_rows(rows)
 
         return all_data
 
+    def _warm_api_hosts(self, tenants: List[Dict]):
+        """
+        Open a pooled connection to each unique regional API host
+
+        The fan-outs hit a handful of regional hosts; preconnecting in
+        parallel pays the per-host TLS handshakes up front so the actual
+        per-tenant requests start on warm sockets. Responses (and
+        failures) are discarded.
+
+        Args:
+            tenants: Tenant dictionaries as returned by get_tenants
+        """
+        hosts = {t["apiHost"] for t in tenants if t.get("apiHost")}
+
+        if not hosts:
+            return
+
+        def preconnect(host):
+            try:
+                self._session.head(host, timeout=5)
+            except requests.RequestException:
+                pass
+
+        with ThreadPoolExecutor(max_workers=min(8, len(hosts))) as executor:
+            list(executor.map(preconnect, hosts))
+
     def get_tenant_health(self, tenant_id: str, api_host: str) -> Dict:
         """
         Get account health check for a specific tenant
@@ -250,129 +919,293 @@ class SophosAPIClient:
         Returns:
             dict: Health check data for the tenant
         """
-        if not self.access_token:
-            self.authenticate()
+        cached = self._ttl_get(("health", tenant_id))
+        if cached is not None:
+            return cached
 
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "X-Tenant-ID": tenant_id
-        }
+        self._ensure_token()
+
+        headers = {"X-Tenant-ID": tenant_id}
 
-        response = requests.get(
+        health_data = self._conditional_get(
             f"{api_host}/account-health-check/v1/health-check",
             headers=headers
         )
-        response.raise_for_status()
-
-        return response.json()
 
-    def get_all_tenant_health(self) -> List[Dict]:
+        self._ttl_set(("health", tenant_id), health_data, self.HEALTH_TTL)
+        return health_data
+
+    # Scalar health components: output name, path to the score-bearing
+    # node, and whether the node's "total" must be positive for the
+    # score to count (a category with no devices has no meaningful score)
+    _HEALTH_SCORE_PATHS = (
+        ("computer_protection", ("endpoint", "protection", "computer"), True),
+        ("server_protection", ("endpoint", "protection", "server"), True),
+        ("computer_exclusions", ("endpoint", "exclusions", "policy", "computer"), True),
+        ("server_exclusions", ("endpoint", "exclusions", "policy", "server"), True),
+        ("global_exclusions", ("endpoint", "exclusions", "global"), False),
+        ("computer_tamper", ("endpoint", "tamperProtection", "computer"), True),
+        ("server_tamper", ("endpoint", "tamperProtection", "server"), True),
+        ("global_tamper", ("endpoint", "tamperProtection", "globalDetail"), False),
+    )
+
+    @staticmethod
+    def _walk(data: Optional[Dict], path: tuple):
+        """Follow a key path through nested dicts, or None if it breaks off"""
+        for key in path:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(key)
+        return data
+
+    @classmethod
+    def _extract_scores(cls, health_data: Dict) -> Dict:
         """
-        Get account health for all tenants
+        Pull every scalar health score out of a health-check response
+
+        Args:
+            health_data: Raw health check data for one tenant
 
         Returns:
-            list: List of dictionaries containing tenant info and health data
+            dict: Component name -> score (None where absent or gated off)
         """
-        tenants = self.get_tenants()
-        all_health_data = []
+        scores = {}
 
-        for tenant in tenants:
-            tenant_id = tenant.get("id")
-            tenant_name = tenant.get("name")
-            api_host = tenant.get("apiHost")
+        for name, path, needs_total in cls._HEALTH_SCORE_PATHS:
+            node = cls._walk(health_data, path)
+            if not isinstance(node, dict) or (needs_total and node.get("total", 0) <= 0):
+                scores[name] = None
+            else:
+                scores[name] = node.get("score")
 
-            if not tenant_id or not api_host:
-                continue
+        return scores
+
+    @staticmethod
+    def _avg_child_scores(node: Optional[Dict]) -> Optional[float]:
+        """Average the "score" of every child dict under a node"""
+        scores = []
 
+        for child in (node or {}).values():
             try:
-                health_data = self.get_tenant_health(tenant_id, api_host)
-
-                # Extract endpoint health data
-                endpoint = health_data.get("endpoint", {})
-
-                # Protection scores (combine computer and server)
-                protection = endpoint.get("protection", {})
-                computer_protection = protection.get("computer", {}).get("score") if protection.get("computer", {}).get("total", 0) > 0 else None
-                server_protection = protection.get("server", {}).get("score") if protection.get("server", {}).get("total", 0) > 0 else None
-
-                # Policy scores
-                policy = endpoint.get("policy", {})
-                computer_policy_scores = []
-                server_policy_scores = []
-
-                for policy_type, policy_data in policy.get("computer", {}).items():
-                    if isinstance(policy_data, dict) and "score" in policy_data:
-                        computer_policy_scores.append(policy_data["score"])
-
-                for policy_type, policy_data in policy.get("server", {}).items():
-                    if isinstance(policy_data, dict) and "score" in policy_data:
-                        server_policy_scores.append(policy_data["score"])
-
-                avg_computer_policy = sum(computer_policy_scores) / len(computer_policy_scores) if computer_policy_scores else None
-                avg_server_policy = sum(server_policy_scores) / len(server_policy_scores) if server_policy_scores else None
-
-                # Exclusions scores
-                exclusions = endpoint.get("exclusions", {})
-                computer_exclusions = exclusions.get("policy", {}).get("computer", {}).get("score") if exclusions.get("policy", {}).get("computer", {}).get("total", 0) > 0 else None
-                server_exclusions = exclusions.get("policy", {}).get("server", {}).get("score") if exclusions.get("policy", {}).get("server", {}).get("total", 0) > 0 else None
-                global_exclusions = exclusions.get("global", {}).get("score") if "score" in exclusions.get("global", {}) else None
-
-                # Tamper protection scores
-                tamper = endpoint.get("tamperProtection", {})
-                computer_tamper = tamper.get("computer", {}).get("score") if tamper.get("computer", {}).get("total", 0) > 0 else None
-                server_tamper = tamper.get("server", {}).get("score") if tamper.get("server", {}).get("total", 0) > 0 else None
-                global_tamper = tamper.get("globalDetail", {}).get("score") if "score" in tamper.get("globalDetail", {}) else None
-
-                # Network device scores (firewall)
-                network_device = health_data.get("networkDevice", {})
-                firewall = network_device.get("firewall", {})
-                firewall_scores = []
-
-                for check_type, check_data in firewall.items():
-                    if isinstance(check_data, dict) and "score" in check_data:
-                        firewall_scores.append(check_data["score"])
-
-                avg_firewall = sum(firewall_scores) / len(firewall_scores) if firewall_scores else None
-
-                # Calculate weighted average scores (only for components that exist)
-                protection_scores = [s for s in [computer_protection, server_protection] if s is not None]
-                avg_protection = sum(protection_scores) / len(protection_scores) if protection_scores else None
-
-                # If no protection (no endpoints), then policy, exclusions, and tamper are also N/A
-                if avg_protection is None:
-                    avg_policy = None
-                    avg_exclusions = None
-                    avg_tamper = None
-                else:
-                    policy_scores = [s for s in [avg_computer_policy, avg_server_policy] if s is not None]
-                    avg_policy = sum(policy_scores) / len(policy_scores) if policy_scores else None
-
-                    exclusions_scores = [s for s in [computer_exclusions, server_exclusions, global_exclusions] if s is not None]
-                    avg_exclusions = sum(exclusions_scores) / len(exclusions_scores) if exclusions_scores else None
-
-                    tamper_scores = [s for s in [computer_tamper, server_tamper, global_tamper] if s is not None]
-                    avg_tamper = sum(tamper_scores) / len(tamper_scores) if tamper_scores else None
-
-                # Calculate overall score (only include categories that have data)
-                all_scores = [s for s in [avg_protection, avg_policy, avg_exclusions, avg_tamper, avg_firewall] if s is not None]
-                overall_score = sum(all_scores) / len(all_scores) if all_scores else None
-
-                all_health_data.append({
-                    "tenant_name": tenant_name,
-                    "tenant_id": tenant_id,
-                    "overall_score": round(overall_score, 1) if overall_score is not None else "N/A",
-                    "protection_score": round(avg_protection, 1) if avg_protection is not None else "N/A",
-                    "policy_score": round(avg_policy, 1) if avg_policy is not None else "N/A",
-                    "exclusions_score": round(avg_exclusions, 1) if avg_exclusions is not None else "N/A",
-                    "tamper_protection_score": round(avg_tamper, 1) if avg_tamper is not None else "N/A",
-                    "firewall_score": round(avg_firewall, 1) if avg_firewall is not None else "N/A"
-                })
-            except Exception as e:
-                # Continue with other tenants if one fails
-                print(f"Warning: Failed to get health data for tenant {tenant_name}: {e}")
+                scores.append(child["score"])
+            except (TypeError, KeyError):
                 continue
 
+        return sum(scores) / len(scores) if scores else None
+
+    def _collect_health_components(self, tenant: Dict) -> Optional[tuple]:
+        """
+        Fetch the raw score components for a single tenant
+
+        No averaging happens here: the worker only extracts the fixed-width
+        component vectors so the outer method can reduce every tenant in
+        one vectorized pass. Errors are caught here so one failing tenant
+        doesn't abort the whole fan-out.
+
+        Args:
+            tenant: A tenant dictionary as returned by get_tenants
+
+        Returns:
+            tuple: (tenant_name, tenant_id, protection, policy, exclusions,
+                tamper, firewall) with None for missing scores, or None
+                on failure
+        """
+        tenant_id = tenant.get("id")
+        tenant_name = tenant.get("name")
+        api_host = tenant.get("apiHost")
+
+        if not tenant_id or not api_host:
+            return None
+
+        try:
+            health_data = self.get_tenant_health(tenant_id, api_host)
+            return self._components_from_health(tenant_name, tenant_id, health_data)
+        except Exception as e:
+            # Continue with other tenants if one fails
+            print(f"Warning: Failed to get health data for tenant {tenant_name}: {e}")
+            return None
+
+    @classmethod
+    def _components_from_health(cls, tenant_name: str, tenant_id: str, health_data: Dict) -> tuple:
+        """Build one tenant's raw component tuple from its health payload"""
+        # Scalar components via the declarative path table
+        scores = cls._extract_scores(health_data)
+
+        return (
+            tenant_name,
+            tenant_id,
+            (scores["computer_protection"], scores["server_protection"]),
+            (
+                cls._avg_child_scores(cls._walk(health_data, ("endpoint", "policy", "computer"))),
+                cls._avg_child_scores(cls._walk(health_data, ("endpoint", "policy", "server")))
+            ),
+            (scores["computer_exclusions"], scores["server_exclusions"], scores["global_exclusions"]),
+            (scores["computer_tamper"], scores["server_tamper"], scores["global_tamper"]),
+            cls._avg_child_scores(cls._walk(health_data, ("networkDevice", "firewall")))
+        )
+
+    async def _aget_health_components(self, client: "httpx.AsyncClient", tenant: Dict) -> Optional[tuple]:
+        """
+        Async variant of the per-tenant health component collection
+
+        Args:
+            client: The shared httpx.AsyncClient
+            tenant: A tenant dictionary as returned by get_tenants
+
+        Returns:
+            tuple: Raw component tuple, or None on failure
+        """
+        tenant_id = tenant.get("id")
+        tenant_name = tenant.get("name")
+        api_host = tenant.get("apiHost")
+
+        if not tenant_id or not api_host:
+            return None
+
+        try:
+            health_data = self._ttl_get(("health", tenant_id))
+            if health_data is None:
+                response = await self._aget(
+                    client,
+                    f"{api_host}/account-health-check/v1/health-check",
+                    headers={"X-Tenant-ID": tenant_id}
+                )
+                response.raise_for_status()
+                health_data = self._json(response)
+                self._ttl_set(("health", tenant_id), health_data, self.HEALTH_TTL)
+            return self._components_from_health(tenant_name, tenant_id, health_data)
+        except Exception as e:
+            # Continue with other tenants if one fails
+            print(f"Warning: Failed to get health data for tenant {tenant_name}: {e}")
+            return None
+
+    async def _aget_all_health_components(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[tuple]:
+        """
+        Gather raw health components for all tenants over a shared
+        HTTP/2 client
+
+        Args:
+            progress_callback: Optional callable invoked as (done, total)
+                after each tenant completes
+
+        Returns:
+            list: Component tuples for every reachable tenant
+        """
+        tenants = self.get_tenants()
+        total = len(tenants)
+        done = 0
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async with self._async_client() as client:
+
+            async def collect(tenant):
+                nonlocal done
+                async with semaphore:
+                    components = await self._aget_health_components(client, tenant)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+                return components
+
+            gathered = await asyncio.gather(*(collect(tenant) for tenant in tenants))
+
+        return [components for components in gathered if components is not None]
+
+    @staticmethod
+    def _row_means(matrix: "np.ndarray") -> "np.ndarray":
+        """Mean over each row ignoring NaNs; all-NaN rows stay NaN"""
+        present = ~np.isnan(matrix)
+        counts = present.sum(axis=1)
+        sums = np.where(present, matrix, 0.0).sum(axis=1)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def get_all_tenant_health(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[HealthRow]:
+        """
+        Get account health for all tenants
+
+        Tenants are fetched concurrently; each worker issues one health
+        check call and returns raw component vectors. The averaging runs
+        afterwards as a handful of vectorized NumPy reductions over one
+        array per score category instead of per-tenant Python loops.
+
+        Args:
+            progress_callback: Optional callable invoked as (done, total)
+                after each tenant completes
+
+        Returns:
+            list: List of HealthRow records, one per reachable tenant
+        """
+        if httpx is not None:
+            results = asyncio.run(self._aget_all_health_components(progress_callback))
+        else:
+            tenants = self.get_tenants()
+            self._warm_api_hosts(tenants)
+            results = []
+            done = 0
+
+            with ThreadPoolExecutor(max_workers=min(self._max_concurrency, max(1, len(tenants)))) as executor:
+                for components in executor.map(self._collect_health_components, tenants):
+                    if components is not None:
+                        results.append(components)
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, len(tenants))
+
+        if not results:
+            return []
+
+        # Struct-of-arrays: one (tenants x components) matrix per category
+        n = len(results)
+        protection = np.full((n, 2), np.nan)
+        policy = np.full((n, 2), np.nan)
+        exclusions = np.full((n, 3), np.nan)
+        tamper = np.full((n, 3), np.nan)
+        firewall = np.full(n, np.nan)
+
+        for i, (_, _, prot, pol, excl, tamp, fire) in enumerate(results):
+            protection[i] = [np.nan if v is None else v for v in prot]
+            policy[i] = [np.nan if v is None else v for v in pol]
+            exclusions[i] = [np.nan if v is None else v for v in excl]
+            tamper[i] = [np.nan if v is None else v for v in tamp]
+            if fire is not None:
+                firewall[i] = fire
+
+        avg_protection = self._row_means(protection)
+        avg_policy = self._row_means(policy)
+        avg_exclusions = self._row_means(exclusions)
+        avg_tamper = self._row_means(tamper)
+
+        # If no protection (no endpoints), then policy, exclusions, and
+        # tamper are also N/A
+        no_protection = np.isnan(avg_protection)
+        avg_policy[no_protection] = np.nan
+        avg_exclusions[no_protection] = np.nan
+        avg_tamper[no_protection] = np.nan
+
+        # Overall score averages whichever categories have data
+        overall = self._row_means(np.column_stack(
+            (avg_protection, avg_policy, avg_exclusions, avg_tamper, firewall)
+        ))
+
+        def score(values: "np.ndarray", i: int):
+            return _NA if np.isnan(values[i]) else round(float(values[i]), 1)
+
+        all_health_data = [
+            HealthRow(
+                tenant_name=name,
+                tenant_id=tenant_id,
+                overall_score=score(overall, i),
+                protection_score=score(avg_protection, i),
+                policy_score=score(avg_policy, i),
+                exclusions_score=score(avg_exclusions, i),
+                tamper_protection_score=score(avg_tamper, i),
+                firewall_score=score(firewall, i)
+            )
+            for i, (name, tenant_id, *_) in enumerate(results)
+        ]
+
         # Sort by tenant name
-        all_health_data.sort(key=lambda x: x.get("tenant_name", "").lower())
+        all_health_data.sort(key=lambda x: x.tenant_name.lower())
 
         return all_health_data
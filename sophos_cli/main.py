@@ -1,33 +1,102 @@
 """Main CLI application for Sophos Partner API"""
 
+import queue
 import sys
+import threading
+from dataclasses import astuple
+
+# Only Console and Prompt are imported eagerly; Table, Panel and the
+# progress widgets pull in a lot of Rich (and Pygments), so they are
+# imported inside the functions that render them to keep startup fast
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
 from rich.prompt import Prompt
-from rich import box
 
 from .api_client import SophosAPIClient
-from .utils import export_to_csv
+from .utils import _resolve_compression, export_rows_to_csv
 
 console = Console()
 
+# Source keys projected out of each tenant dict, in CSV column order
+_TENANT_FIELDS = ("name", "id", "dataRegion", "apiHost", "status")
+
+# Rich re-computes layout per row, so rendering tens of thousands of
+# rows dominates interactive time. Past this many rows only the first
+# and last few are shown; the CSV export still carries everything
+_TABLE_ROW_LIMIT = 500
+_TABLE_EDGE_ROWS = 20
+
+
+def _add_table_rows(table, rows, add_row):
+    """
+    Add rows to a table, truncating very large datasets to head and tail
+
+    Args:
+        table: The Rich table being built
+        rows: The full list of row records
+        add_row: Callable that adds one record to the table
+
+    Returns:
+        int: Number of rows omitted from the display (0 if none)
+    """
+    if len(rows) <= _TABLE_ROW_LIMIT:
+        for row in rows:
+            add_row(row)
+        return 0
+
+    for row in rows[:_TABLE_EDGE_ROWS]:
+        add_row(row)
+    table.add_section()
+    for row in rows[-_TABLE_EDGE_ROWS:]:
+        add_row(row)
+    return len(rows) - 2 * _TABLE_EDGE_ROWS
+
+
+def _tenant_progress(description: str):
+    """
+    Build a progress bar plus a (done, total) callback for per-tenant fan-outs
+
+    Returns:
+        tuple: (Progress instance, callback suitable for progress_callback)
+    """
+    from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn
+
+    progress = Progress(
+        TextColumn("[yellow]{task.description}[/yellow]"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        console=console,
+        transient=True
+    )
+    task_id = progress.add_task(description, total=None)
+
+    def callback(done, total):
+        progress.update(task_id, completed=done, total=total)
+
+    return progress, callback
+
 
 def display_menu():
     """Display the main menu"""
+    from rich import box
+    from rich.panel import Panel
+
     menu_text = """
 [bold cyan]Sophos Partner CLI[/bold cyan]
 
 [1] List All Tenants
 [2] List All Endpoints
 [3] Show Account Health for All Tenants
-[4] Exit
+[4] Refresh Cached Data
+[5] Exit
 """
     console.print(Panel(menu_text, box=box.ROUNDED, border_style="cyan"))
 
 
 def list_tenants(client: SophosAPIClient):
     """Display all tenants and export to CSV"""
+    from rich import box
+    from rich.table import Table
+
     console.print("\n[yellow]Fetching tenants...[/yellow]")
 
     try:
@@ -44,32 +113,22 @@ def list_tenants(client: SophosAPIClient):
         table.add_column("Data Region", style="green")
         table.add_column("Status", style="yellow")
 
-        # Prepare data for CSV export
-        csv_data = []
-
-        for tenant in tenants:
-            name = tenant.get("name", "N/A")
-            tenant_id = tenant.get("id", "N/A")
-            data_region = tenant.get("dataRegion", "N/A")
-            status = tenant.get("status", "N/A")
-
-            table.add_row(name, tenant_id, data_region, status)
+        # Project each tenant once; the same rows feed table and export
+        rows = [[tenant.get(key, "N/A") for key in _TENANT_FIELDS] for tenant in tenants]
 
-            csv_data.append({
-                "tenant_name": name,
-                "tenant_id": tenant_id,
-                "data_region": data_region,
-                "api_host": tenant.get("apiHost", "N/A"),
-                "status": status
-            })
+        omitted = _add_table_rows(table, rows, lambda row: table.add_row(
+            row[0], row[1], row[2], row[4]
+        ))
 
         # Display table
         console.print(table)
+        if omitted:
+            console.print(f"[dim]{omitted} rows omitted from display; the CSV export contains all rows.[/dim]")
         console.print(f"\n[green]Total tenants: {len(tenants)}[/green]")
 
-        # Export to CSV
-        csv_path = export_to_csv(
-            csv_data,
+        # Export the precomputed rows without re-reading the tenant dicts
+        csv_path = export_rows_to_csv(
+            rows,
             "sophos_tenants",
             ["tenant_name", "tenant_id", "data_region", "api_host", "status"]
         )
@@ -81,11 +140,64 @@ def list_tenants(client: SophosAPIClient):
 
 def list_endpoints(client: SophosAPIClient):
     """Display all endpoints across all tenants and export to CSV"""
+    from rich import box
+    from rich.table import Table
+
     console.print("\n[yellow]Fetching endpoints from all tenants...[/yellow]")
-    console.print("[dim]This may take a moment...[/dim]\n")
 
     try:
-        endpoints_data = client.get_all_endpoints()
+        # Surface a bad SOPHOS_CLI_COMPRESS value before fetching
+        # anything rather than from inside the writer thread
+        _resolve_compression(None)
+
+        # Pipeline: rows stream onto a queue as each tenant's response
+        # arrives and a writer thread drains them into the CSV, so the
+        # export finishes almost as soon as the last response does
+        row_queue = queue.Queue(maxsize=1000)
+        export_result = {}
+
+        def write_csv():
+            try:
+                export_result["path"] = export_rows_to_csv(
+                    iter(row_queue.get, None),
+                    "sophos_endpoints",
+                    ["tenant_name", "tenant_id", "endpoint_hostname", "endpoint_os", "endpoint_os_version", "last_active"]
+                )
+            except Exception as e:
+                export_result["error"] = e
+
+        writer_thread = threading.Thread(target=write_csv)
+
+        def put_row(row):
+            # Never block on a queue nobody is draining: if the writer
+            # died, drop the row — its stored error is raised after join
+            while writer_thread.is_alive():
+                try:
+                    row_queue.put(row, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        # Explicit tuple: the CSV header leads with tenant_name while the
+        # dataclass fields lead with tenant_id
+        def enqueue_rows(rows):
+            for endpoint in rows:
+                put_row((endpoint.tenant_name, endpoint.tenant_id, endpoint.endpoint_hostname,
+                         endpoint.endpoint_os, endpoint.endpoint_os_version, endpoint.last_active))
+
+        writer_thread.start()
+
+        try:
+            progress, callback = _tenant_progress("Tenants fetched")
+            with progress:
+                endpoints_data = client.get_all_endpoints(progress_callback=callback,
+                                                          on_rows=enqueue_rows)
+        finally:
+            put_row(None)
+            writer_thread.join()
+
+        if "error" in export_result:
+            raise export_result["error"]
 
         if not endpoints_data:
             console.print("[red]No endpoints found.[/red]")
@@ -99,26 +211,21 @@ def list_endpoints(client: SophosAPIClient):
         table.add_column("OS Version", style="yellow", no_wrap=False)
         table.add_column("Last Active", style="blue", no_wrap=False)
 
-        for endpoint in endpoints_data:
-            table.add_row(
-                endpoint["tenant_name"],
-                endpoint["endpoint_hostname"],
-                endpoint["endpoint_os"],
-                str(endpoint["endpoint_os_version"]),
-                str(endpoint["last_active"])
-            )
+        omitted = _add_table_rows(table, endpoints_data, lambda endpoint: table.add_row(
+            endpoint.tenant_name,
+            endpoint.endpoint_hostname,
+            endpoint.endpoint_os,
+            str(endpoint.endpoint_os_version),
+            str(endpoint.last_active)
+        ))
 
         # Display table
         console.print(table)
+        if omitted:
+            console.print(f"[dim]{omitted} rows omitted from display; the CSV export contains all rows.[/dim]")
         console.print(f"\n[green]Total endpoints: {len(endpoints_data)}[/green]")
 
-        # Export to CSV
-        csv_path = export_to_csv(
-            endpoints_data,
-            "sophos_endpoints",
-            ["tenant_name", "tenant_id", "endpoint_hostname", "endpoint_os", "endpoint_os_version", "last_active"]
-        )
-        console.print(f"[green]Data exported to: {csv_path}[/green]\n")
+        console.print(f"[green]Data exported to: {export_result['path']}[/green]\n")
 
     except Exception as e:
         console.print(f"[red]Error fetching endpoints: {e}[/red]")
@@ -126,11 +233,15 @@ def list_endpoints(client: SophosAPIClient):
 
 def show_tenant_health(client: SophosAPIClient):
     """Display account health for all tenants and export to CSV"""
+    from rich import box
+    from rich.table import Table
+
     console.print("\n[yellow]Fetching account health from all tenants...[/yellow]")
-    console.print("[dim]This may take a moment...[/dim]\n")
 
     try:
-        health_data = client.get_all_tenant_health()
+        progress, callback = _tenant_progress("Tenants checked")
+        with progress:
+            health_data = client.get_all_tenant_health(progress_callback=callback)
 
         if not health_data:
             console.print("[red]No health data found.[/red]")
@@ -146,24 +257,25 @@ def show_tenant_health(client: SophosAPIClient):
         table.add_column("Tamper Protection", style="yellow", justify="center")
         table.add_column("Firewall", style="yellow", justify="center")
 
-        for health in health_data:
-            table.add_row(
-                health["tenant_name"],
-                str(health["overall_score"]),
-                str(health["protection_score"]),
-                str(health["policy_score"]),
-                str(health["exclusions_score"]),
-                str(health["tamper_protection_score"]),
-                str(health["firewall_score"])
-            )
+        omitted = _add_table_rows(table, health_data, lambda health: table.add_row(
+            health.tenant_name,
+            str(health.overall_score),
+            str(health.protection_score),
+            str(health.policy_score),
+            str(health.exclusions_score),
+            str(health.tamper_protection_score),
+            str(health.firewall_score)
+        ))
 
         # Display table
         console.print(table)
+        if omitted:
+            console.print(f"[dim]{omitted} rows omitted from display; the CSV export contains all rows.[/dim]")
         console.print(f"\n[green]Total tenants checked: {len(health_data)}[/green]")
 
         # Export to CSV
-        csv_path = export_to_csv(
-            health_data,
+        csv_path = export_rows_to_csv(
+            (astuple(health) for health in health_data),
             "sophos_tenant_health",
             ["tenant_name", "tenant_id", "overall_score", "protection_score",
              "policy_score", "exclusions_score", "tamper_protection_score", "firewall_score"]
@@ -179,40 +291,46 @@ def main():
     console.print("\n[bold cyan]Welcome to Sophos Partner CLI[/bold cyan]\n")
 
     try:
-        # Initialize API client
-        client = SophosAPIClient()
-
-        # Authenticate
-        console.print("[yellow]Authenticating...[/yellow]")
-        client.authenticate()
-
-        # Get partner info
-        whoami = client.get_whoami()
-
-        if whoami.get("idType") != "partner":
-            console.print("[red]Error: This tool requires a partner account.[/red]")
-            sys.exit(1)
-
-        console.print(f"[green]Authenticated as: {whoami.get('id')}[/green]\n")
-
-        # Main menu loop
-        while True:
-            display_menu()
-            choice = Prompt.ask(
-                "[bold]Select an option[/bold]",
-                choices=["1", "2", "3", "4"],
-                default="4"
-            )
-
-            if choice == "1":
-                list_tenants(client)
-            elif choice == "2":
-                list_endpoints(client)
-            elif choice == "3":
-                show_tenant_health(client)
-            elif choice == "4":
-                console.print("\n[cyan]Goodbye![/cyan]\n")
-                break
+        # The context manager closes the pooled session on the way out
+        # and persists the ETag cache for the next run
+        with SophosAPIClient() as client:
+            # Authenticate
+            console.print("[yellow]Authenticating...[/yellow]")
+            client.authenticate()
+
+            # Get partner info
+            whoami = client.get_whoami()
+
+            if whoami.get("idType") != "partner":
+                console.print("[red]Error: This tool requires a partner account.[/red]")
+                sys.exit(1)
+
+            console.print(f"[green]Authenticated as: {whoami.get('id')}[/green]\n")
+
+            # Warm the tenants cache while the user reads the menu
+            client.prefetch_tenants()
+
+            # Main menu loop
+            while True:
+                display_menu()
+                choice = Prompt.ask(
+                    "[bold]Select an option[/bold]",
+                    choices=["1", "2", "3", "4", "5"],
+                    default="5"
+                )
+
+                if choice == "1":
+                    list_tenants(client)
+                elif choice == "2":
+                    list_endpoints(client)
+                elif choice == "3":
+                    show_tenant_health(client)
+                elif choice == "4":
+                    client.clear_cache()
+                    console.print("\n[green]Cached data cleared; the next selection will re-fetch.[/green]\n")
+                elif choice == "5":
+                    console.print("\n[cyan]Goodbye![/cyan]\n")
+                    break
 
     except ValueError as e:
         console.print(f"[red]Configuration Error: {e}[/red]")